@@ -3,182 +3,462 @@ GitHub Repository Creator for Team Projects
 This script creates private repositories in a GitHub organization and adds team members with write access.
 
 Requirements:
-- pip install pandas openpyxl PyGithub
+- pip install xlsx2csv "httpx[http2]" tqdm
 
 Usage:
 1. Set your GitHub Personal Access Token as an environment variable: GITHUB_TOKEN
+   (optionally add more tokens as GITHUB_TOKEN_1, GITHUB_TOKEN_2, ... to spread calls across their rate limits)
 2. Run: python create_github_repos.py
 """
 
 import os
-import pandas as pd
-from github import Github, GithubException
+import re
+import sys
+import csv
+import json
 import time
+import atexit
+import logging
+import tempfile
+import asyncio
+import itertools
+import contextlib
+import httpx
+from xlsx2csv import Xlsx2csv
+from tqdm.asyncio import tqdm_asyncio
+from tqdm.contrib.logging import logging_redirect_tqdm
+
+log = logging.getLogger(__name__)
 
 # Configuration
-GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')
+# GITHUB_TOKEN plus any GITHUB_TOKEN_1..N; requests are spread round-robin across them
+GITHUB_TOKENS = list(dict.fromkeys(
+    os.environ[name] for name in sorted(os.environ) if name.startswith('GITHUB_TOKEN') and os.environ[name]
+))
 ORG_NAME = 'SENG321-2026'
 EXCEL_FILE = 'Teams List.xlsx'
+CACHE_FILE = '.github_cache.json'  # ETags from previous runs, for conditional requests
+STATE_FILE = '.runstate.json'  # Collaborator grants confirmed by previous runs
 NUM_TEAMS = 8
+GITHUB_API_URL = 'https://api.github.com'
+MAX_CONCURRENT_REQUESTS = 10  # Cap on in-flight API calls to stay clear of secondary rate limits
+MAX_RETRIES = 3  # Retries when GitHub asks us to back off (403/429) or has a transient server error
+RETRY_STATUSES = (502, 503, 504)
+
+# Accepted (lowercase) Excel headers, in priority order.
+# Without a "Team" header, an untitled first column holds the team (as in Teams List.xlsx).
+TEAM_COLUMNS = ('team',)
+GITHUB_ID_COLUMNS = ('github id', 'github_id', 'githubid')
+_TEAM_RE = re.compile(r'team\s*(\d+)', re.IGNORECASE)
+_GITHUB_ID_JUNK_RE = re.compile(r'[@\s]')  # Characters stripped from GitHub IDs
+
+def find_column(headers, names):
+    """
+    Return the index of the header matching the highest-priority accepted name.
+    Headers are compared stripped and lowercase; names are in priority order.
+    """
+    normalized = [header.strip().lower() for header in headers]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    raise ValueError(f"None of the columns {list(names)} found in {headers}")
+
+def find_team_column(headers):
+    """
+    Return the index of the team column, falling back to an untitled first column.
+    """
+    try:
+        return find_column(headers, TEAM_COLUMNS)
+    except ValueError:
+        if headers and not headers[0].strip():
+            return 0
+        raise
 
 def read_teams_from_excel(file_path):
     """
     Read team information from Excel file.
-    Expected columns: Team, GITHUB ID (and other columns)
+    Expected columns: Team, GITHUB ID (other columns are ignored)
     """
     try:
-        df = pd.read_excel(file_path)
-        print(f"Excel columns found: {df.columns.tolist()}")
-        
-        # Organize data by team
-        teams = {}
-        current_team = None
+        # Convert the sheet to CSV with a streaming XML parser, then read it row by row
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'sheet.csv')
+            Xlsx2csv(file_path, outputencoding='utf-8', skip_hidden_rows=False).convert(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as f:
+                # Index rows by position: header names can repeat (e.g. several untitled columns)
+                rows = csv.reader(f)
+                headers = next(rows, [])
+                log.info(f"Excel columns found: {headers}")
+                team_idx = find_team_column(headers)
+                gh_idx = find_column(headers, GITHUB_ID_COLUMNS)
+                
+                # Organize data by team
+                teams = {}
+                current_team = None
+                
+                for row in rows:
+                    # Empty cells read as ''; rows can be shorter than the header
+                    team = row[team_idx] if team_idx < len(row) else ''
+                    github_id = row[gh_idx] if gh_idx < len(row) else ''
+                    
+                    # Update current team if this row contains team info
+                    if team:
+                        # Extract team number (e.g., "Team 1" -> 1, "Team 1- B215" -> 1)
+                        match = _TEAM_RE.search(team)
+                        if match:
+                            current_team = int(match.group(1))
+                    
+                    # Add GitHub ID to current team if valid
+                    if current_team and github_id:
+                        # Clean GitHub ID (remove whitespace, @, etc.); logins are case-insensitive
+                        github_id_clean = _GITHUB_ID_JUNK_RE.sub('', github_id).lower()
+                        # Skip empty entries; the set drops duplicates
+                        if github_id_clean:
+                            teams.setdefault(current_team, set()).add(github_id_clean)
         
-        for index, row in df.iterrows():
-            # Check all possible column names for team info
-            team = row.get('Team') or row.get('team') or row.get('Unnamed: 0')
-            github_id = row.get('GITHUB ID') or row.get('GitHub ID') or row.get('github_id')
-            
-            # Update current team if this row contains team info
-            if not pd.isna(team):
-                team_str = str(team).strip()
-                if 'team' in team_str.lower():
-                    # Extract team number (e.g., "Team 1" -> 1, "Team 1- B215" -> 1)
-                    import re
-                    match = re.search(r'team\s*(\d+)', team_str, re.IGNORECASE)
-                    if match:
-                        current_team = int(match.group(1))
-            
-            # Add GitHub ID to current team if valid
-            if current_team and not pd.isna(github_id):
-                github_id_str = str(github_id).strip()
-                # Skip empty or invalid entries
-                if github_id_str and github_id_str.lower() != 'nan':
-                    if current_team not in teams:
-                        teams[current_team] = []
-                    # Clean GitHub ID (remove whitespace, @, etc.)
-                    github_id_clean = github_id_str.replace('@', '').replace(' ', '')
-                    teams[current_team].append(github_id_clean)
-        
-        return teams
+        return {team_num: sorted(members) for team_num, members in teams.items()}
     except Exception as e:
-        print(f"Error reading Excel file: {e}")
+        log.error(f"Error reading Excel file: {e}")
         raise
 
-def create_repository(g, org, repo_name, description):
+def load_json(file_path):
     """
-    Create a private repository in the organization.
+    Load a JSON file written by a previous run (empty if there is none).
     """
     try:
-        repo = org.create_repo(
-            name=repo_name,
-            description=description,
-            private=True,
-            auto_init=True  # Initialize with README
+        with open(file_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_json(file_path, data):
+    """
+    Persist data for the next run.
+    """
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+def state_key(org_name, repo_name, github_username):
+    """
+    Run-state key for a user's access to a repository.
+    """
+    return f"{org_name}/{repo_name}:{github_username.lower()}"
+
+def rate_limit_delay(response):
+    """
+    Work out how long to wait before the next request from the rate-limit headers.
+    Only throttles when fewer requests remain than seconds until the budget resets.
+    """
+    remaining = response.headers.get('x-ratelimit-remaining')
+    reset = response.headers.get('x-ratelimit-reset')
+    if remaining is None or reset is None:
+        return 0
+    time_to_reset = max(0, int(reset) - time.time())
+    if int(remaining) >= time_to_reset:
+        return 0
+    return time_to_reset / max(int(remaining), 1)
+
+class RequestPacer:
+    """
+    Pacing shared by every concurrent request made with one token: requests
+    start no closer together than the gap from the latest rate-limit headers.
+    """
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.gap = 0
+        self.next_time = 0.0
+    
+    async def wait(self):
+        """
+        Wait for this request's turn, then reserve the next slot.
+        """
+        async with self.lock:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_time = time.monotonic() + self.gap
+    
+    def update(self, response):
+        """
+        Recompute the gap between requests from a response's rate-limit headers.
+        """
+        self.gap = rate_limit_delay(response)
+        self.next_time = max(self.next_time, time.monotonic() + self.gap)
+
+# One pacer per (HTTP client, rate-limit resource): each token has separate
+# budgets for REST ("core") and GraphQL ("graphql") calls
+pacers = {}
+
+async def github_request(clients, semaphore, method, url, **kwargs):
+    """
+    Issue an API request, honoring Retry-After on secondary rate limits,
+    retrying transient server errors, and pacing further calls when the
+    primary rate-limit budget runs low.
+    clients: round-robin iterator over the per-token HTTP clients
+    """
+    client = next(clients)
+    resource = 'graphql' if url == "/graphql" else 'core'
+    pacer = pacers.setdefault((client, resource), RequestPacer())
+    await pacer.wait()  # Before taking a semaphore slot, so paced callers don't hold one while sleeping
+    async with semaphore:
+        for attempt in range(MAX_RETRIES + 1):
+            response = await client.request(method, url, **kwargs)
+            if attempt == MAX_RETRIES:
+                break
+            if response.status_code in RETRY_STATUSES:
+                delay = 0.5 * 2 ** attempt
+                log.info(f"  ⏳ Server error {response.status_code}, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                continue
+            if response.status_code not in (403, 429):
+                break
+            retry_after = response.headers.get('retry-after')
+            if retry_after is not None:
+                delay = int(retry_after) * 2 ** attempt
+            elif response.headers.get('x-ratelimit-remaining') == '0':
+                delay = max(0, int(response.headers['x-ratelimit-reset']) - time.time())
+            else:
+                break  # Plain permission error, retrying won't help
+            log.info(f"  ⏳ Rate limited, retrying in {delay:.0f}s...")
+            await asyncio.sleep(delay)
+    
+    pacer.update(response)
+    return response
+
+async def repository_exists(clients, semaphore, org_name, repo_name, cache):
+    """
+    Check whether a repository exists, sending the ETag from a previous run as
+    If-None-Match so that repeat checks come back as 304 Not Modified, which
+    does not count against the rate limit.
+    """
+    url = f"/repos/{org_name}/{repo_name}"
+    headers = {}
+    if url in cache:
+        headers['If-None-Match'] = cache[url]['etag']
+    
+    response = await github_request(clients, semaphore, 'GET', url, headers=headers)
+    if response.status_code == 304:
+        return True
+    if response.status_code == 200:
+        if 'etag' in response.headers:
+            cache[url] = {'etag': response.headers['etag']}
+        return True
+    cache.pop(url, None)
+    return False
+
+async def create_repositories_graphql(clients, semaphore, owner_id, team_nums, cache):
+    """
+    Create the private Client and Designer repositories for a batch of teams
+    with a single GraphQL mutation (one aliased createRepository per repo).
+    Repositories that already exist are skipped.
+    Returns: dict of team number -> (client repo name, designer repo name),
+    with None in place of any repository that could not be created or reused.
+    """
+    # alias -> (repository name, description)
+    repos = {}
+    for team_num in team_nums:
+        for kind in ('Client', 'Designer'):
+            repos[f"{kind.lower()}{team_num}"] = (
+                f"{kind}{team_num}",
+                f"{kind} repository for Team {team_num}"
+            )
+    
+    exists = await asyncio.gather(*[
+        repository_exists(clients, semaphore, ORG_NAME, repo_name, cache)
+        for repo_name, _ in repos.values()
+    ])
+    
+    created = {}
+    fields = []
+    for (alias, (repo_name, description)), repo_exists in zip(repos.items(), exists):
+        if repo_exists:
+            log.warning(f"⚠ Repository {repo_name} already exists, reusing it...")
+            created[alias] = repo_name
+            continue
+        fields.append(
+            f"{alias}: createRepository(input: {{"
+            f"name: {json.dumps(repo_name)}, "
+            f"ownerId: {json.dumps(owner_id)}, "
+            f"visibility: PRIVATE, "
+            f"description: {json.dumps(description)}"
+            f"}}) {{ repository {{ name }} }}"
         )
-        print(f"✓ Created repository: {repo_name}")
-        return repo
-    except GithubException as e:
-        if e.status == 422:
-            print(f"⚠ Repository {repo_name} already exists, fetching it...")
-            repo = org.get_repo(repo_name)
-            return repo
+    
+    data = {}
+    errors = {}
+    if fields:
+        response = await github_request(
+            clients, semaphore, 'POST', "/graphql",
+            json={'query': "mutation { " + " ".join(fields) + " }"}
+        )
+        if response.status_code == 200:
+            body = response.json()
+            data = body.get('data') or {}
+            errors = {error['path'][0]: error['message'] for error in body.get('errors', []) if error.get('path')}
         else:
-            print(f"✗ Error creating {repo_name}: {e}")
-            return None
+            log.error(f"✗ Error creating repositories: {response.status_code} {response.text}")
+    
+    for alias, (repo_name, _) in repos.items():
+        if alias in created:
+            continue
+        if data.get(alias):
+            log.info(f"✓ Created repository: {repo_name}")
+            created[alias] = repo_name
+        elif 'already exists' in errors.get(alias, ''):
+            log.warning(f"⚠ Repository {repo_name} already exists, reusing it...")
+            created[alias] = repo_name
+        else:
+            log.error(f"✗ Error creating {repo_name}: {errors.get(alias, 'unknown error')}")
+            created[alias] = None
+    
+    return {
+        team_num: (created[f"client{team_num}"], created[f"designer{team_num}"])
+        for team_num in team_nums
+    }
 
-def add_collaborator(repo, github_username, permission='push'):
+async def add_collaborator(clients, semaphore, org_name, repo_name, github_username, state, permission='push'):
     """
     Add a collaborator to the repository with specified permission.
     permission: 'pull', 'push', 'admin', 'maintain', 'triage'
+    state: grants confirmed by previous runs; skipped without an API call and updated on success
     """
-    try:
-        repo.add_to_collaborators(github_username, permission=permission)
-        print(f"  ✓ Added {github_username} with {permission} access")
-        time.sleep(0.5)  # Rate limiting
+    key = state_key(org_name, repo_name, github_username)
+    if state.get(key) == permission:
+        log.info(f"  ℹ {github_username} already added to {repo_name} in a previous run, skipping...")
         return True
-    except GithubException as e:
-        print(f"  ✗ Error adding {github_username}: {e}")
-        return False
+    
+    response = await github_request(
+        clients, semaphore, 'PUT', f"/repos/{org_name}/{repo_name}/collaborators/{github_username}",
+        json={'permission': permission}
+    )
+    if response.status_code in (201, 204):
+        log.info(f"  ✓ Added {github_username} to {repo_name} with {permission} access")
+        state[key] = permission
+        return True
+    log.error(f"  ✗ Error adding {github_username} to {repo_name}: {response.status_code} {response.text}")
+    return False
+
+async def create_all_repos(clients, semaphore, owner_id, team_nums, cache):
+    """
+    Phase 1: create the Client and Designer repositories for every team concurrently.
+    Returns: dict of team number -> (client repo name, designer repo name)
+    """
+    repo_maps = await tqdm_asyncio.gather(
+        *[
+            create_repositories_graphql(clients, semaphore, owner_id, [team_num], cache)
+            for team_num in team_nums
+        ],
+        desc="Creating repositories", unit="team"
+    )
+    return {team_num: repos for repo_map in repo_maps for team_num, repos in repo_map.items()}
+
+async def grant_all_collaborators(clients, semaphore, repo_map, teams, state):
+    """
+    Phase 2: add every team member to both of their team's repositories concurrently.
+    """
+    await tqdm_asyncio.gather(
+        *[
+            add_collaborator(clients, semaphore, ORG_NAME, repo_name, member, state, permission='push')
+            for team_num, repo_names in repo_map.items()
+            for repo_name in repo_names if repo_name
+            for member in teams[team_num]
+        ],
+        desc="Adding team members", unit="user"
+    )
+
+async def run(teams, cache, state):
+    # One pooled HTTP/2 client per token; each transport also retries failed connects
+    async with contextlib.AsyncExitStack() as stack:
+        client_list = []
+        for token in GITHUB_TOKENS:
+            client = await stack.enter_async_context(httpx.AsyncClient(
+                base_url=GITHUB_API_URL,
+                headers={
+                    'Authorization': f"Bearer {token}",
+                    'Accept': 'application/vnd.github+json'
+                },
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=10),
+                    retries=MAX_RETRIES
+                )
+            ))
+            
+            # Validate authentication
+            response = await client.get("/user")
+            if response.status_code != 200:
+                log.error(f"Authentication failed: {response.status_code} {response.text}")
+                return False
+            log.info(f"Authenticated as: {response.json()['login']}")
+            client_list.append(client)
+        clients = itertools.cycle(client_list)
+        
+        # Get organization
+        response = await next(clients).get(f"/orgs/{ORG_NAME}")
+        if response.status_code != 200:
+            log.error(f"Error accessing organization {ORG_NAME}: {response.status_code} {response.text}")
+            return False
+        org = response.json()
+        owner_id = org['node_id']  # GraphQL ID used as ownerId when creating repositories
+        log.info(f"Organization: {org['login']}\n")
+        
+        team_nums = []
+        for team_num in range(1, NUM_TEAMS + 1):
+            if team_num not in teams:
+                log.warning(f"⚠ Warning: Team {team_num} not found in Excel file, skipping...")
+                continue
+            team_nums.append(team_num)
+        
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        # Create all repositories first, then add all team members
+        log.info("=" * 60)
+        log.info(f"Creating repositories for {len(team_nums)} teams...")
+        log.info("=" * 60)
+        repo_map = await create_all_repos(clients, semaphore, owner_id, team_nums, cache)
+        
+        log.info("\n" + "=" * 60)
+        log.info("Adding team members...")
+        log.info("=" * 60)
+        await grant_all_collaborators(clients, semaphore, repo_map, teams, state)
+    return True
 
 def main():
     # Validate GitHub token
-    if not GITHUB_TOKEN:
-        print("ERROR: GITHUB_TOKEN environment variable not set!")
-        print("\nTo set your token:")
-        print("  Windows (PowerShell): $env:GITHUB_TOKEN='your_token_here'")
-        print("  Linux/Mac: export GITHUB_TOKEN='your_token_here'")
-        print("\nCreate a token at: https://github.com/settings/tokens")
-        print("Required scopes: repo, admin:org")
-        return
-    
-    # Initialize GitHub API
-    try:
-        g = Github(GITHUB_TOKEN)
-        user = g.get_user()
-        print(f"Authenticated as: {user.login}")
-    except GithubException as e:
-        print(f"Authentication failed: {e}")
-        return
-    
-    # Get organization
-    try:
-        org = g.get_organization(ORG_NAME)
-        print(f"Organization: {org.login}\n")
-    except GithubException as e:
-        print(f"Error accessing organization {ORG_NAME}: {e}")
+    if not GITHUB_TOKENS:
+        log.error("ERROR: GITHUB_TOKEN environment variable not set!")
+        log.info("\nTo set your token:")
+        log.info("  Windows (PowerShell): $env:GITHUB_TOKEN='your_token_here'")
+        log.info("  Linux/Mac: export GITHUB_TOKEN='your_token_here'")
+        log.info("\nCreate a token at: https://github.com/settings/tokens")
+        log.info("Required scopes: repo, admin:org")
         return
     
     # Read teams from Excel
-    print(f"Reading teams from {EXCEL_FILE}...")
+    log.info(f"Reading teams from {EXCEL_FILE}...")
     teams = read_teams_from_excel(EXCEL_FILE)
-    print(f"\nFound {len(teams)} teams:")
+    log.info(f"\nFound {len(teams)} teams:")
     for team_num, members in sorted(teams.items()):
-        print(f"  Team {team_num}: {len(members)} members - {', '.join(members)}")
-    print()
+        log.info(f"  Team {team_num}: {len(members)} members - {', '.join(members)}")
+    log.info('')
     
-    # Create repositories and add team members
-    print("=" * 60)
-    print("Creating repositories and adding team members...")
-    print("=" * 60)
+    cache = load_json(CACHE_FILE)
+    atexit.register(save_json, CACHE_FILE, cache)
+    state = load_json(STATE_FILE)
+    atexit.register(save_json, STATE_FILE, state)
     
-    for team_num in range(1, NUM_TEAMS + 1):
-        if team_num not in teams:
-            print(f"\n⚠ Warning: Team {team_num} not found in Excel file, skipping...")
-            continue
-        
-        team_members = teams[team_num]
-        print(f"\n📁 Processing Team {team_num} ({len(team_members)} members)")
-        
-        # Create Client repository
-        client_repo_name = f"Client{team_num}"
-        client_repo = create_repository(
-            g, org, client_repo_name,
-            f"Client repository for Team {team_num}"
-        )
-        
-        if client_repo:
-            for member in team_members:
-                add_collaborator(client_repo, member, permission='push')
-        
-        # Create Designer repository
-        designer_repo_name = f"Designer{team_num}"
-        designer_repo = create_repository(
-            g, org, designer_repo_name,
-            f"Designer repository for Team {team_num}"
-        )
-        
-        if designer_repo:
-            for member in team_members:
-                add_collaborator(designer_repo, member, permission='push')
-        
-        time.sleep(1)  # Rate limiting between teams
+    if not asyncio.run(run(teams, cache, state)):
+        return
     
-    print("\n" + "=" * 60)
-    print("✓ Repository setup complete!")
-    print("=" * 60)
-    print(f"\nCreated repositories can be viewed at:")
-    print(f"https://github.com/orgs/{ORG_NAME}/repositories")
+    log.info("\n" + "=" * 60)
+    log.info("✓ Repository setup complete!")
+    log.info("=" * 60)
+    log.info(f"\nCreated repositories can be viewed at:")
+    log.info(f"https://github.com/orgs/{ORG_NAME}/repositories")
 
 if __name__ == "__main__":
-    main()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    logging.getLogger('httpx').setLevel(logging.WARNING)  # Don't log every request
+    # Route log lines through tqdm so they don't break the progress bar
+    with logging_redirect_tqdm():
+        main()
@@ -3,23 +3,63 @@ GitHub Read Access Granter
 This script grants read access to existing repositories in a GitHub organization.
 
 Requirements:
-- pip install pandas openpyxl PyGithub
+- pip install xlsx2csv "PyGithub>=2.6" tqdm
 
 Usage:
 1. Prepare repo_readaccess.xlsx with columns: Repository, GITHUB ID
 2. Set your GitHub Personal Access Token as an environment variable: GITHUB_TOKEN
+   (optionally add more tokens as GITHUB_TOKEN_1, GITHUB_TOKEN_2, ... to spread calls across their rate limits)
 3. Run: python grant_read_access.py
 """
 
 import os
-import pandas as pd
-from github import Github, GithubException
+import re
+import sys
+import csv
+import json
+import atexit
+import logging
+import tempfile
+import itertools
+import threading
+from xlsx2csv import Xlsx2csv
+from github import Auth, Github, GithubException
+from urllib3.util.retry import Retry
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
+
+log = logging.getLogger(__name__)
 
 # Configuration
-GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')
+# GITHUB_TOKEN plus any GITHUB_TOKEN_1..N; requests are spread round-robin across them
+GITHUB_TOKENS = list(dict.fromkeys(
+    os.environ[name] for name in sorted(os.environ) if name.startswith('GITHUB_TOKEN') and os.environ[name]
+))
 ORG_NAME = 'SENG312-2026'
 EXCEL_FILE = 'repo_readaccess.xlsx'
+CACHE_FILE = '.github_cache.json'  # ETags from previous runs, for conditional requests
+STATE_FILE = '.runstate.json'  # Read-access grants confirmed by previous runs
+MAX_RETRIES = 3  # Retries when GitHub asks us to back off (403/429)
+MAX_WORKERS = 8  # Concurrent collaborator grants per repository
+POOL_SIZE = 20  # Keep-alive HTTPS connections shared by the worker threads
+
+# Accepted (lowercase) Excel headers, in priority order
+REPO_COLUMNS = ('repository', 'repo', 'repo name')
+GITHUB_ID_COLUMNS = ('github id', 'github_id', 'githubid')
+_GITHUB_ID_JUNK_RE = re.compile(r'[@\s]')  # Characters stripped from GitHub IDs
+
+def find_column(headers, names):
+    """
+    Return the index of the header matching the highest-priority accepted name.
+    Headers are compared stripped and lowercase; names are in priority order.
+    """
+    normalized = [header.strip().lower() for header in headers]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    raise ValueError(f"None of the columns {list(names)} found in {headers}")
 
 def read_access_list_from_excel(file_path):
     """
@@ -28,166 +68,334 @@ def read_access_list_from_excel(file_path):
     Returns: dict with repo names as keys and list of GitHub IDs as values
     """
     try:
-        df = pd.read_excel(file_path)
-        print(f"Excel columns found: {df.columns.tolist()}")
-        
-        # Organize data by repository
-        repo_access = {}
-        current_repo = None
+        # xlsx2csv reports a missing file as an invalid workbook, so check first
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(file_path)
         
-        for index, row in df.iterrows():
-            # Check for repository name (try different possible column names)
-            repo = row.get('Repository') or row.get('repository') or row.get('Repo') or row.get('repo') or row.get('Repo Name') or row.get('repo name')
-            github_id = row.get('GITHUB ID') or row.get('GitHub ID') or row.get('github_id') or row.get('github id') or row.get('GithubID') or row.get('githubid')
-            
-            # Update current repository if this row contains repo info
-            if not pd.isna(repo):
-                repo_str = str(repo).strip()
-                if repo_str and repo_str.lower() != 'nan':
-                    current_repo = repo_str
-                    if current_repo not in repo_access:
-                        repo_access[current_repo] = []
-            
-            # Add GitHub ID to current repository if valid
-            if current_repo and not pd.isna(github_id):
-                github_id_str = str(github_id).strip()
-                # Skip empty or invalid entries
-                if github_id_str and github_id_str.lower() != 'nan':
-                    # Clean GitHub ID (remove whitespace, @, etc.)
-                    github_id_clean = github_id_str.replace('@', '').replace(' ', '')
-                    if github_id_clean not in repo_access[current_repo]:
-                        repo_access[current_repo].append(github_id_clean)
+        # Convert the sheet to CSV with a streaming XML parser, then read it row by row
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'sheet.csv')
+            Xlsx2csv(file_path, outputencoding='utf-8', skip_hidden_rows=False).convert(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as f:
+                # Index rows by position: header names can repeat (e.g. several untitled columns)
+                rows = csv.reader(f)
+                headers = next(rows, [])
+                log.info(f"Excel columns found: {headers}")
+                repo_idx = find_column(headers, REPO_COLUMNS)
+                gh_idx = find_column(headers, GITHUB_ID_COLUMNS)
+                
+                # Organize data by repository
+                repo_access = {}
+                current_repo = None
+                
+                for row in rows:
+                    # Empty cells read as ''; rows can be shorter than the header
+                    repo = row[repo_idx] if repo_idx < len(row) else ''
+                    github_id = row[gh_idx] if gh_idx < len(row) else ''
+                    
+                    # Update current repository if this row contains repo info
+                    if repo and repo.strip():
+                        current_repo = repo.strip()
+                        if current_repo not in repo_access:
+                            repo_access[current_repo] = set()
+                    
+                    # Add GitHub ID to current repository if valid
+                    if current_repo and github_id:
+                        # Clean GitHub ID (remove whitespace, @, etc.); logins are case-insensitive
+                        github_id_clean = _GITHUB_ID_JUNK_RE.sub('', github_id).lower()
+                        # Skip empty entries; the set drops duplicates
+                        if github_id_clean:
+                            repo_access[current_repo].add(github_id_clean)
         
-        return repo_access
+        return {repo_name: sorted(users) for repo_name, users in repo_access.items()}
     except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found!")
-        print("Please make sure the Excel file exists in the current directory.")
+        log.error(f"Error: File '{file_path}' not found!")
+        log.info("Please make sure the Excel file exists in the current directory.")
         raise
     except Exception as e:
-        print(f"Error reading Excel file: {e}")
+        log.error(f"Error reading Excel file: {e}")
         raise
 
-def grant_read_access(repo, github_username):
+def load_json(file_path):
     """
-    Grant read (pull) access to a user for the repository.
+    Load a JSON file written by a previous run (empty if there is none).
     """
     try:
-        # Check if user already has access
+        with open(file_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_json(file_path, data):
+    """
+    Persist data for the next run.
+    """
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+def state_key(org_name, repo_name, github_username):
+    """
+    Run-state key for a user's access to a repository.
+    """
+    return f"{org_name}/{repo_name}:{github_username.lower()}"
+
+def client_pool(clients):
+    """
+    Return a function that hands out the Github clients round-robin.
+    Safe to call from the worker threads.
+    """
+    lock = threading.Lock()
+    cycle = itertools.cycle(clients)
+    
+    def next_client():
+        with lock:
+            return next(cycle)
+    return next_client
+
+class RequestPacer:
+    """
+    Pacing shared by every worker thread using one token: calls start no
+    closer together than the gap from the latest rate-limit headers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gap = 0
+        self.next_time = 0.0
+    
+    def wait(self):
+        """
+        Wait for this call's turn, then reserve the next slot.
+        """
+        with self.lock:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = time.monotonic() + self.gap
+    
+    def update(self, g):
+        """
+        Recompute the gap between calls from the client's last rate-limit headers.
+        Only throttles when fewer requests remain than seconds until the budget resets.
+        """
+        remaining, _ = g.rate_limiting
+        time_to_reset = max(0, g.rate_limiting_resettime - time.time())
+        gap = time_to_reset / max(remaining, 1) if remaining < time_to_reset else 0
+        with self.lock:
+            self.gap = gap
+            self.next_time = max(self.next_time, time.monotonic() + gap)
+
+# One pacer per Github client (i.e. per token), since each token has its own budget
+pacers = {}
+pacers_lock = threading.Lock()
+
+def throttled(g, fn, *args, **kwargs):
+    """
+    Call a PyGithub method, honoring Retry-After on secondary rate limits,
+    waiting for the reset when the primary budget is exhausted, and pacing
+    calls across all threads when that budget runs low.
+    """
+    with pacers_lock:
+        pacer = pacers.setdefault(g, RequestPacer())
+    pacer.wait()
+    
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            permission = repo.get_collaborator_permission(github_username)
-            if permission in ['admin', 'write', 'read']:
-                print(f"  ℹ {github_username} already has {permission} access, skipping...")
-                return True
-        except GithubException:
-            pass  # User doesn't have access, proceed to add them
-        
-        # Add collaborator with read (pull) permission
-        repo.add_to_collaborators(github_username, permission='pull')
-        print(f"  ✓ Granted read access to {github_username}")
-        time.sleep(0.5)  # Rate limiting
+            result = fn(*args, **kwargs)
+            break
+        except GithubException as e:
+            if e.status not in (403, 429) or attempt == MAX_RETRIES:
+                raise
+            headers = e.headers or {}
+            retry_after = headers.get('retry-after')
+            if retry_after is not None:
+                delay = int(retry_after) * 2 ** attempt
+            elif headers.get('x-ratelimit-remaining') == '0':
+                delay = max(0, int(headers['x-ratelimit-reset']) - time.time())
+            else:
+                raise  # Plain permission error, retrying won't help
+            log.info(f"  ⏳ Rate limited, retrying in {delay:.0f}s...")
+            time.sleep(delay)
+    
+    pacer.update(g)
+    return result
+
+def get_collaborators(g, repo_name, cache):
+    """
+    List a repository's collaborators, sending the ETag from a previous run as
+    If-None-Match so that an unchanged listing comes back as 304 Not Modified
+    (which does not count against the rate limit) and is served from the cache.
+    Returns: dict of lowercase GitHub login -> role name
+    """
+    requester = g._Github__requester
+    collaborators = []
+    page = 1
+    while True:
+        url = f"/repos/{ORG_NAME}/{repo_name}/collaborators?per_page=100&page={page}"
+        cached = cache.get(url)
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+        response_headers, data = throttled(g, requester.requestJsonAndCheck, 'GET', url, headers=headers)
+        if data is None and cached:  # 304 Not Modified
+            data = cached['data']
+        elif 'etag' in response_headers:
+            cache[url] = {'etag': response_headers['etag'], 'data': data}
+        collaborators.extend(data)
+        if len(data) < 100:
+            break
+        page += 1
+    return {c['login'].lower(): c.get('role_name', 'read') for c in collaborators}
+
+def grant_read_access(next_client, repo_name, github_username, existing, state):
+    """
+    Grant read (pull) access to a user for the repository.
+    next_client: client_pool() function picking the token to use for this call
+    existing: collaborators already on the repository, from get_collaborators()
+    state: grants confirmed by previous runs; skipped without an API call and updated on success
+    """
+    key = state_key(ORG_NAME, repo_name, github_username)
+    if state.get(key) == 'pull':
+        log.info(f"  ℹ {github_username} already granted read access in a previous run, skipping...")
+        return True
+    
+    # Check if user already has access
+    if github_username.lower() in existing:
+        log.info(f"  ℹ {github_username} already has {existing[github_username.lower()]} access, skipping...")
+        return True
+    
+    try:
+        # Add collaborator with read (pull) permission (clients are lazy, so get_repo makes no request)
+        g = next_client()
+        repo = g.get_repo(f"{ORG_NAME}/{repo_name}")
+        throttled(g, repo.add_to_collaborators, github_username, permission='pull')
+        log.info(f"  ✓ Granted read access to {github_username}")
+        state[key] = 'pull'
         return True
     except GithubException as e:
         if e.status == 404:
-            print(f"  ✗ User {github_username} not found on GitHub")
+            log.error(f"  ✗ User {github_username} not found on GitHub")
         else:
-            print(f"  ✗ Error granting access to {github_username}: {e}")
+            log.error(f"  ✗ Error granting access to {github_username}: {e}")
         return False
 
 def main():
     # Validate GitHub token
-    if not GITHUB_TOKEN:
-        print("ERROR: GITHUB_TOKEN environment variable not set!")
-        print("\nTo set your token:")
-        print("  Windows (PowerShell): $env:GITHUB_TOKEN='your_token_here'")
-        print("  Linux/Mac: export GITHUB_TOKEN='your_token_here'")
-        print("\nCreate a token at: https://github.com/settings/tokens")
-        print("Required scopes: repo, admin:org")
+    if not GITHUB_TOKENS:
+        log.error("ERROR: GITHUB_TOKEN environment variable not set!")
+        log.info("\nTo set your token:")
+        log.info("  Windows (PowerShell): $env:GITHUB_TOKEN='your_token_here'")
+        log.info("  Linux/Mac: export GITHUB_TOKEN='your_token_here'")
+        log.info("\nCreate a token at: https://github.com/settings/tokens")
+        log.info("Required scopes: repo, admin:org")
         return
     
-    # Initialize GitHub API
+    # Initialize GitHub API, one client per token
     try:
-        g = Github(GITHUB_TOKEN)
-        user = g.get_user()
-        print(f"Authenticated as: {user.login}")
+        # Pooled keep-alive connections with retries on transient server errors.
+        # PyGithub's fixed delays between calls are disabled; throttled() paces from the rate-limit headers.
+        # Clients are lazy: objects are only fetched when one of their attributes is read.
+        clients = []
+        for token in GITHUB_TOKENS:
+            g = Github(
+                auth=Auth.Token(token),
+                pool_size=POOL_SIZE,
+                per_page=100,
+                retry=Retry(total=MAX_RETRIES, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+                seconds_between_requests=None,
+                seconds_between_writes=None,
+                lazy=True
+            )
+            log.info(f"Authenticated as: {g.get_user().login}")
+            clients.append(g)
     except GithubException as e:
-        print(f"Authentication failed: {e}")
+        log.error(f"Authentication failed: {e}")
         return
+    next_client = client_pool(clients)
     
     # Get organization
     try:
-        org = g.get_organization(ORG_NAME)
-        print(f"Organization: {org.login}\n")
+        org = next_client().get_organization(ORG_NAME)
+        log.info(f"Organization: {org.login}\n")
+        
+        # List the organization's repositories once (100 per page) instead of looking each one up
+        repo_by_name = {repo.name.lower(): repo.name for repo in org.get_repos(type='all')}
     except GithubException as e:
-        print(f"Error accessing organization {ORG_NAME}: {e}")
+        log.error(f"Error accessing organization {ORG_NAME}: {e}")
         return
     
     # Read access list from Excel
-    print(f"Reading access list from {EXCEL_FILE}...")
+    log.info(f"Reading access list from {EXCEL_FILE}...")
     try:
         repo_access = read_access_list_from_excel(EXCEL_FILE)
     except Exception:
         return
     
-    print(f"\nFound {len(repo_access)} repositories:")
+    cache = load_json(CACHE_FILE)
+    atexit.register(save_json, CACHE_FILE, cache)
+    state = load_json(STATE_FILE)
+    atexit.register(save_json, STATE_FILE, state)
+    
+    log.info(f"\nFound {len(repo_access)} repositories:")
     for repo_name, users in repo_access.items():
-        print(f"  {repo_name}: {len(users)} user(s) - {', '.join(users)}")
-    print()
+        log.info(f"  {repo_name}: {len(users)} user(s) - {', '.join(users)}")
+    log.info('')
     
     # Grant read access to repositories
-    print("=" * 60)
-    print("Granting read access to repositories...")
-    print("=" * 60)
+    log.info("=" * 60)
+    log.info("Granting read access to repositories...")
+    log.info("=" * 60)
     
     total_repos = len(repo_access)
     successful_repos = 0
     failed_repos = []
     
-    for repo_name, users in repo_access.items():
-        print(f"\n📁 Processing repository: {repo_name}")
+    for repo_name, users in tqdm(repo_access.items(), desc="Repositories", unit="repo"):
+        log.info(f"\n📁 Processing repository: {repo_name}")
+        
+        # Look up the repository's exact name in the prefetched listing
+        org_repo_name = repo_by_name.get(repo_name.lower())
+        if org_repo_name is None:
+            log.error(f"  ✗ Repository '{repo_name}' not found in organization!")
+            failed_repos.append(repo_name)
+            continue
+        log.info(f"  ✓ Repository found")
         
-        # Get repository
         try:
-            repo = org.get_repo(repo_name)
-            print(f"  ✓ Repository found")
+            existing = get_collaborators(next_client(), org_repo_name, cache)
         except GithubException as e:
-            if e.status == 404:
-                print(f"  ✗ Repository '{repo_name}' not found in organization!")
-                failed_repos.append(repo_name)
-                continue
-            else:
-                print(f"  ✗ Error accessing repository: {e}")
-                failed_repos.append(repo_name)
-                continue
+            log.error(f"  ✗ Error accessing repository: {e}")
+            failed_repos.append(repo_name)
+            continue
         
-        # Grant access to each user
+        # Grant access to each user concurrently
         success_count = 0
-        for github_id in users:
-            if grant_read_access(repo, github_id):
-                success_count += 1
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(grant_read_access, next_client, org_repo_name, github_id, existing, state): github_id for github_id in users}
+            for future in as_completed(futures):
+                success_count += int(future.result())
         
         if success_count == len(users):
             successful_repos += 1
-            print(f"  ✓ Successfully granted access to all {len(users)} user(s)")
+            log.info(f"  ✓ Successfully granted access to all {len(users)} user(s)")
         else:
-            print(f"  ⚠ Granted access to {success_count}/{len(users)} user(s)")
-        
-        time.sleep(1)  # Rate limiting between repositories
+            log.warning(f"  ⚠ Granted access to {success_count}/{len(users)} user(s)")
     
     # Summary
-    print("\n" + "=" * 60)
-    print("✓ Read access granting complete!")
-    print("=" * 60)
-    print(f"\nSummary:")
-    print(f"  Total repositories: {total_repos}")
-    print(f"  Successful: {successful_repos}")
-    print(f"  Failed: {len(failed_repos)}")
+    log.info("\n" + "=" * 60)
+    log.info("✓ Read access granting complete!")
+    log.info("=" * 60)
+    log.info(f"\nSummary:")
+    log.info(f"  Total repositories: {total_repos}")
+    log.info(f"  Successful: {successful_repos}")
+    log.info(f"  Failed: {len(failed_repos)}")
     
     if failed_repos:
-        print(f"\nFailed repositories:")
+        log.info(f"\nFailed repositories:")
         for repo_name in failed_repos:
-            print(f"  - {repo_name}")
+            log.info(f"  - {repo_name}")
     
-    print(f"\nOrganization repositories: https://github.com/orgs/{ORG_NAME}/repositories")
+    log.info(f"\nOrganization repositories: https://github.com/orgs/{ORG_NAME}/repositories")
 
 if __name__ == "__main__":
-    main()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    # Route log lines through tqdm so they don't break the progress bar
+    with logging_redirect_tqdm():
+        main()